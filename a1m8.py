@@ -2,6 +2,7 @@ import serial
 from enum import Enum
 import struct
 import time
+from timing import SampleClock
 
 HEALTH_STATUS = {0: "Good", 1: "Warning", 2: "Error"}
 
@@ -53,6 +54,11 @@ class A1M8:
         self.serial = serial.Serial(port, 115200, dsrdtr=True, timeout=TIMEOUT)
         self.bytes_left = 2
         self.serial.dtr = False
+        self.rx_time = 0
+        self.timestamp = 0
+        self.rate = 0
+        self.last_turn_rx_time = None
+        self.clock = SampleClock()
 
     def stop(self):
         self.serial.close()
@@ -186,9 +192,17 @@ class A1M8:
                     raise TimeoutError("scan timeout!")
             else:
                 last_data_time = time.time()
+                self.rx_time = time.monotonic()
                 #assert len(buffer) == lenght
                 if data_type == ResponseCode.SCAN.value:
-                    yield process_scan(buffer)
+                    angle, quality, distance, s = process_scan(buffer)
+                    self.timestamp = self.clock.stamp(self.rx_time, angle, self.rate)
+                    if s:
+                        # rotation rate (deg/s) from the receive times of the turn boundaries
+                        if self.last_turn_rx_time is not None and self.rx_time > self.last_turn_rx_time:
+                            self.rate = 360 / (self.rx_time - self.last_turn_rx_time)
+                        self.last_turn_rx_time = self.rx_time
+                    yield angle, quality, distance, s
 
     def send_stop(self):
         self.send(Request.STOP)
@@ -3,6 +3,7 @@ import serial
 from enum import Enum
 import struct
 import time
+from time import monotonic
 import sys
 from generated import lidar_data_pb2  as pbl
 import ecal.core.core as ecal_core
@@ -18,16 +19,21 @@ class Ecal:
         self.lidar_sub.set_callback(self.handle_lidar_data)
         self.last_angle = 0
         self.speed = 0
+        self.rx_time = 0
+        self.timestamp = 0
 
     def handle_lidar_data(self, topic_name, msg, time):
+        rx_time = monotonic()
         #for angle, distance in reversed(list(zip(msg.angles, msg.distances))):
         for angle, distance, quality in list(zip(msg.angles, msg.distances, msg.quality)):
             ...
-            self.queue.put((360-angle, distance, quality))
+            self.queue.put((360-angle, distance, quality, rx_time))
 
     def start_scan(self):
         while True:
-            angle, dist, quality = self.queue.get()
+            angle, dist, quality, self.rx_time = self.queue.get()
+            # no rotation rate nor device time: the sample time is its receive time
+            self.timestamp = self.rx_time
             s = 1 if (angle < self.last_angle) else 0
             self.last_angle = angle
             yield angle, quality, dist, s
@@ -0,0 +1,255 @@
+import math
+import os
+import queue
+import struct
+import threading
+import time
+from array import array
+
+WRITE_BUFFER = 1 << 20
+# point: x, y, z, intensity as float32 (m), timestamp as float64 (s, time.monotonic() timebase)
+POINT_FORMAT = "ffffd"
+POINT_SIZE = struct.calcsize("<" + POINT_FORMAT)
+
+
+def to_cartesian(frame):
+    """
+    :return: flat list of x, y, z, intensity, timestamp of the valid points of the frame
+    """
+    points = []
+    for angle, distance, quality, t in zip(frame.angles, frame.distances, frame.qualities, frame.timestamps):
+        if quality != 0 and distance != 0:
+            d = distance / 1000
+            points += (d * math.cos(angle), d * math.sin(angle), 0, quality, t)
+    return points
+
+
+class BinaryWriter:
+    """
+    Write points to a binary file whose header holds the number of points.
+    The header is written with a fixed width point count, and rewritten on close.
+    Frames are buffered and written by blocks of WRITE_BUFFER bytes, the file
+    only holds whole frames so that it can be cut back to them on error.
+    """
+    EXT = ""
+    HEADER = ""
+
+    def __init__(self, path):
+        self.file = open(path, "wb", buffering=0)
+        self.buffer = bytearray()
+        self.buffered_points = 0
+        self.buffered_frames = 0
+        self.points = 0
+        self.flushed = self.write_header()
+        self.size = self.flushed
+
+    def write_header(self):
+        header = self.HEADER.format(points=self.points).encode()
+        self.file.seek(0)
+        self.write_all(header)
+        return len(header)
+
+    def write_all(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[self.file.write(view):]
+
+    def write(self, frame):
+        points = to_cartesian(frame)
+        nb = len(points) // len(POINT_FORMAT)
+        self.buffer += struct.pack("<" + POINT_FORMAT * nb, *points)
+        self.buffered_points += nb
+        self.buffered_frames += 1
+        self.size += nb * POINT_SIZE
+        if len(self.buffer) >= WRITE_BUFFER:
+            self.flush()
+
+    def flush(self):
+        self.file.seek(self.flushed)
+        self.write_all(self.buffer)
+        self.flushed += len(self.buffer)
+        self.points += self.buffered_points
+        self.buffer = bytearray()
+        self.buffered_points = 0
+        self.buffered_frames = 0
+
+    def full(self):
+        return False
+
+    def close(self):
+        self.flush()
+        self.write_header()
+        self.file.close()
+
+    def abort(self):
+        """
+        Called after an error: cut the file back to the frames fully written and close it.
+        :return: number of frames lost
+        """
+        try:
+            os.ftruncate(self.file.fileno(), self.flushed)
+            self.write_header()
+        except (OSError, ValueError):
+            pass
+        self.file.close()
+        return self.buffered_frames
+
+
+class PCDWriter(BinaryWriter):
+    EXT = "pcd"
+    HEADER = ("# .PCD v0.7 - Point Cloud Data file format\n"
+              "VERSION 0.7\n"
+              "FIELDS x y z intensity timestamp\n"
+              "SIZE 4 4 4 4 8\n"
+              "TYPE F F F F F\n"
+              "COUNT 1 1 1 1 1\n"
+              "WIDTH {points:010d}\n"
+              "HEIGHT 1\n"
+              "VIEWPOINT 0 0 0 1 0 0 0\n"
+              "POINTS {points:010d}\n"
+              "DATA binary\n")
+
+
+class PLYWriter(BinaryWriter):
+    EXT = "ply"
+    HEADER = ("ply\n"
+              "format binary_little_endian 1.0\n"
+              "comment radarQt scan\n"
+              "element vertex {points:010d}\n"
+              "property float x\n"
+              "property float y\n"
+              "property float z\n"
+              "property float intensity\n"
+              "property double timestamp\n"
+              "end_header\n")
+
+
+class NPZWriter:
+    """
+    Accumulate points in memory and save them as a numpy .npz file on close.
+    Each file is a chunk of at most MAX_FRAMES frames, so that saving it stays short.
+    """
+    EXT = "npz"
+    MAX_FRAMES = 100
+
+    def __init__(self, path):
+        import numpy    # only needed for this format
+        self.numpy = numpy
+        self.path = path
+        self.columns = {name: array("f") for name in ("x", "y", "z", "intensity")}
+        self.columns["timestamp"] = array("d")
+        self.frame_sizes = array("I")
+        self.size = 0
+
+    def write(self, frame):
+        points = to_cartesian(frame)
+        nb = len(points) // len(POINT_FORMAT)
+        for i, column in enumerate(self.columns.values()):
+            column.extend(points[i::len(POINT_FORMAT)])
+        self.frame_sizes.append(nb)
+        self.size += nb * POINT_SIZE
+
+    def full(self):
+        return len(self.frame_sizes) >= self.MAX_FRAMES
+
+    def close(self):
+        np = self.numpy
+        arrays = {name: np.frombuffer(column, dtype=column.typecode) for name, column in self.columns.items()}
+        np.savez(self.path, frame_sizes=np.frombuffer(self.frame_sizes, dtype=self.frame_sizes.typecode), **arrays)
+
+    def abort(self):
+        """
+        Called after an error: remove the partial file.
+        :return: number of frames lost
+        """
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        return len(self.frame_sizes)
+
+
+WRITERS = {w.EXT: w for w in (PCDWriter, PLYWriter, NPZWriter)}
+
+
+class Exporter:
+    """
+    Write frames to point cloud files from a background thread, so that disk stalls
+    never block the acquisition. Frames are dropped when the queue is full.
+    dropped is only written by the acquisition thread, written and lost by the writer thread.
+    A new file is started when the current one exceeds max_bytes or max_seconds (0 to disable),
+    or its writer is full. Files are named <prefix>_<index>.<format>.
+    On a write error, the current file is closed with the frames fully written, the others
+    are counted as lost, and the next frame starts a new file.
+    """
+    def __init__(self, prefix, fmt="pcd", max_bytes=64 << 20, max_seconds=0, queue_size=32):
+        if fmt not in WRITERS:
+            raise Exception(f"Unknown export format {fmt}, expected one of {list(WRITERS)}")
+        self.prefix = prefix
+        self.writer_class = WRITERS[fmt]
+        if self.writer_class is NPZWriter:
+            import numpy    # fail now rather than in the writer thread
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.queue = queue.Queue(queue_size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.file_index = 0
+        self.written = 0
+        self.dropped = 0
+        self.lost = 0
+
+    def start(self):
+        self.thread.start()
+
+    def put(self, frame):
+        """
+        Non blocking: called from the acquisition thread.
+        """
+        try:
+            self.queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        if not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join()
+
+    def open_writer(self):
+        path = f"{self.prefix}_{self.file_index:04d}.{self.writer_class.EXT}"
+        self.file_index += 1
+        return self.writer_class(path), time.monotonic()
+
+    def run(self):
+        writer, t_open = None, 0
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            try:
+                if writer is None:
+                    writer, t_open = self.open_writer()
+                self.written += 1
+                writer.write(frame)
+                if writer.full() or writer.size >= self.max_bytes or \
+                        (self.max_seconds and time.monotonic() - t_open >= self.max_seconds):
+                    writer.close()
+                    writer = None
+            except OSError as e:
+                print(f"export error: {e}")
+                if writer is None:
+                    self.lost += 1
+                else:
+                    lost = writer.abort()
+                    self.written -= lost
+                    self.lost += lost
+                    writer = None
+        if writer is not None:
+            try:
+                writer.close()
+            except OSError as e:
+                print(f"export error: {e}")
+                lost = writer.abort()
+                self.written -= lost
+                self.lost += lost
@@ -5,6 +5,15 @@ import struct
 import time
 import sys
 
+# device timestamp is in ms and wraps at 30000
+TIMESTAMP_WRAP = 30000
+# drift allowed between the device clock and the host clock, in s per s of device time
+CLOCK_DRIFT = 200e-6
+# a packet whose offset is higher than the expected one by more than this is late
+CLOCK_RESYNC = 0.05
+# the offset is only moved up when all packets were late for this long, in s of device time
+CLOCK_RESYNC_WINDOW = 60
+
 
 class RcvState(Enum):
     START = 0
@@ -20,6 +29,48 @@ class LD06:
         self.len = 0
         self.speed = 0
         self.last_angle = 0
+        self.rx_time = 0
+        self.timestamp = 0
+        self.last_device_ts = 0
+        self.device_wraps = 0
+        self.last_device_time = 0
+        self.clock_offset = None
+        self.late_since = None
+        self.late_offset = 0
+
+    def device_to_monotonic(self, device_ts, rx_time):
+        """
+        Convert the device timestamp to the time.monotonic() timebase.
+        The offset between both clocks is the smallest (rx_time - device time) seen,
+        i.e. the one of the packet received with the least transport delay,
+        allowed to increase by CLOCK_DRIFT to follow a host clock running faster.
+        A lower offset (device reset, missed wrap) is adopted at once, a higher one only
+        when all packets were late for CLOCK_RESYNC_WINDOW: a transport backlog stays latency.
+        """
+        if device_ts < self.last_device_ts:
+            self.device_wraps += 1
+        self.last_device_ts = device_ts
+        device_time = (self.device_wraps * TIMESTAMP_WRAP + device_ts) / 1000
+        elapsed = device_time - self.last_device_time
+        self.last_device_time = device_time
+        offset = rx_time - device_time
+        if self.clock_offset is None:
+            self.clock_offset = offset
+            return device_time + self.clock_offset
+        expected = self.clock_offset + CLOCK_DRIFT * elapsed
+        if offset <= expected + CLOCK_RESYNC:
+            self.clock_offset = min(expected, offset)
+            self.late_since = None
+        else:
+            self.clock_offset = expected
+            if self.late_since is None:
+                self.late_since = device_time
+                self.late_offset = offset
+            self.late_offset = min(self.late_offset, offset)
+            if device_time - self.late_since > CLOCK_RESYNC_WINDOW:
+                self.clock_offset = self.late_offset
+                self.late_since = None
+        return device_time + self.clock_offset
 
     def start_scan(self):
         while True:
@@ -33,6 +84,7 @@ class LD06:
                 self.state = RcvState.DATA
                 self.nb_expected = 9 + 3 * self.len
             elif self.state == RcvState.DATA:
+                self.rx_time = time.monotonic()
                 self.speed, = struct.unpack("<H", data[0:2])
                 start_angle, = struct.unpack("<H", data[2:4])
                 start_angle /= 100
@@ -44,6 +96,7 @@ class LD06:
                 crc = struct.unpack("<B", data[mes_data_end+4:])
                 self.state = RcvState.START
                 self.nb_expected = 1
+                t_packet = self.device_to_monotonic(timestamp, self.rx_time)
                 for i in range(self.len):
                     dist, = struct.unpack("<H", mes_data[3*i:3*i+2])
                     quality, = struct.unpack("<B", mes_data[3*i+2:3*i+3])
@@ -51,6 +104,9 @@ class LD06:
                         end_angle += 360
                     step = (end_angle-start_angle)/(self.len-1)
                     angle = (start_angle+step*i)
+                    # speed is in deg/s. t_packet is about the packet receive time,
+                    # that is the time of its last sample
+                    self.timestamp = t_packet - step*(self.len-1-i)/self.speed if self.speed else t_packet
                     if angle >= 360:
                         angle -= 360
                     s = 1 if (angle < self.last_angle) else 0
@@ -8,14 +8,27 @@ import xv11
 import ld06
 import ecalrcv
 import sys
+from scan import Frame
+from timing import LatencyTracker
+from rotation import RotationEstimator
+from export import Exporter
+
+# weight of the last turn in the rotation estimate, 1 means no filtering
+ROTATION_SMOOTHING = 0.3
+
+# set EXPORT_PREFIX (e.g. "scan") to write the scans to EXPORT_PREFIX_0000.pcd, ...
+EXPORT_PREFIX = None
+EXPORT_FORMAT = "pcd"   # pcd, ply or npz
 
 
 class LidarHandler(QtCore.QThread):
-    sample_available = QtCore.pyqtSignal((float, float, float, int))
-    speed = QtCore.pyqtSignal(float)
+    frame_available = QtCore.pyqtSignal(object)
 
-    def __init__(self, parent=None):
+    def __init__(self, latency, exporter=None, parent=None):
         QtCore.QThread.__init__(self, parent)
+        self.latency = latency
+        self.exporter = exporter
+        self.rotation = RotationEstimator(ROTATION_SMOOTHING)
         #self.lidar = a1m8.A1M8("/dev/ttyUSB0")
         #self.lidar = xv11.XV11("/dev/ttyUSB0")
         #self.lidar = ld06.LD06(sys.argv[1])
@@ -24,9 +37,23 @@ class LidarHandler(QtCore.QThread):
     def run(self):
         #msgs = self.lidar.send_reset()
         #print(msgs)
+        # the first turn is partial: frames start on the first turn boundary
+        frame = None
         for angle, quality, distance, s in self.lidar.start_scan():
-            self.sample_available.emit(math.radians(angle), distance, quality, s)
-            self.speed.emit(self.lidar.speed)
+            if s != 0 and frame is not None and len(frame) > 0:
+                # latency is sampled once per turn, on the first sample of the next turn
+                t = time.monotonic()
+                self.latency.record("read", self.lidar.rx_time - self.lidar.timestamp)
+                self.latency.record("decode", t - self.lidar.rx_time)
+                frame.stats = self.rotation.update(frame, self.lidar.timestamp)
+                frame.t_emit = t
+                self.frame_available.emit(frame)
+                if self.exporter is not None:
+                    self.exporter.put(frame)
+            if s != 0:
+                frame = Frame()
+            if frame is not None:
+                frame.append(math.radians(angle), distance, quality, self.lidar.timestamp)
 
 
 class RadarView(QtWidgets.QWidget):
@@ -36,12 +63,11 @@ class RadarView(QtWidgets.QWidget):
                    "#f7a258", "#ef8250", "#e4604e",
                    "#d43d51"]
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, latency, *args, **kwargs):
         QtWidgets.QWidget.__init__(self, *args, **kwargs)
-        self.data = []
-        self.back = []
-        self.last_tour_time = time.time()
-        self.frequency = 0
+        self.latency = latency
+        self.frame = Frame()
+        self.frame_painted = True
         self.last_angle = 0
         self.mm_to_pixel = 0.1
         self.setSizePolicy(
@@ -49,9 +75,6 @@ class RadarView(QtWidgets.QWidget):
             QtWidgets.QSizePolicy.MinimumExpanding
         )
 
-    def set_speed(self, speed):
-        self.frequency = speed/60
-
     def color_from_quality(self, quality):
         #color_index = quality - 15 + len(self.COLOR_SCALE) / 2
         color_index = len(self.COLOR_SCALE) - int(quality * len(self.COLOR_SCALE) / 255) - 1
@@ -63,21 +86,17 @@ class RadarView(QtWidgets.QWidget):
         self.mm_to_pixel *= (1 + d / 1000)
         self.update()
 
-    def add_data(self, angle, distance, quality, s):
-        if s != 0:
-            t = time.time()
-            dt = t - self.last_tour_time
-            self.last_tour_time = t
-            #self.frequency = 0.6*self.frequency + 0.4*1/dt
-            self.data = self.back
-            self.back = []
-            self.update()
-        self.back.append((angle, distance, quality))
+    def set_frame(self, frame):
+        self.frame = frame
+        self.frame_painted = False
+        self.update()
 
     def mousePressEvent(self, a0: QtGui.QMouseEvent) -> None:
-        self.data = []
+        self.frame = Frame()
+        self.frame_painted = True
 
     def paintEvent(self, e: QtGui.QPaintEvent) -> None:
+        t_paint = time.monotonic()
         painter = QtGui.QPainter(self)
 
         # paint background
@@ -87,10 +106,13 @@ class RadarView(QtWidgets.QWidget):
         rect = QtCore.QRect(0, 0, painter.device().width(), painter.device().height())
         painter.fillRect(rect, brush)
 
-        # paint frequency
+        # paint turn statistics
         painter.setPen(QtCore.Qt.white)
-        txt = "{:.2f} Hz".format(self.frequency)
-        painter.drawText(10, 20, txt)
+        if self.frame.stats is not None:
+            painter.drawText(10, 20, str(self.frame.stats))
+
+        # paint latency
+        painter.drawText(10, 40, self.latency.summary("end_to_end"))
 
         # paint scale
         for i, color in enumerate(self.COLOR_SCALE):
@@ -129,7 +151,7 @@ class RadarView(QtWidgets.QWidget):
         # paint points
         painter.setBrush(QtCore.Qt.yellow)
         painter.setPen(QtCore.Qt.NoPen)
-        for angle, distance, quality in self.data:
+        for angle, distance, quality in self.frame:
             if quality != 0 and distance != 0:
                 pos = QtCore.QPointF(self.mm_to_pixel * distance * math.cos(angle), self.mm_to_pixel * distance * math.sin(angle))
                 size = 5
@@ -137,6 +159,13 @@ class RadarView(QtWidgets.QWidget):
                 painter.setBrush(c)
                 painter.drawEllipse(pos, size, size)
 
+        # only the first paint of a frame is relevant for latency
+        if not self.frame_painted:
+            t = time.monotonic()
+            self.latency.record("paint", t - t_paint)
+            self.latency.record("end_to_end", t - self.frame.t_end)
+            self.frame_painted = True
+
 
     def sizeHint(self) -> QtCore.QSize:
         return QtCore.QSize(400, 400)
@@ -149,19 +178,23 @@ class ApplicationWindow(QtWidgets.QMainWindow):
         self.setCentralWidget(self._main)
         layout = QtWidgets.QVBoxLayout(self._main)
 
-        self.radarView = RadarView(self._main)
+        self.latency = LatencyTracker()
+
+        self.radarView = RadarView(self.latency, self._main)
         layout.addWidget(self.radarView)
 
-        self.lidar = LidarHandler()
-        self.lidar.sample_available.connect(self.handle_data)
-        self.lidar.speed.connect(self.handle_speed)
-        self.lidar.start()
+        self.exporter = None
+        if EXPORT_PREFIX is not None:
+            self.exporter = Exporter(EXPORT_PREFIX, EXPORT_FORMAT)
+            self.exporter.start()
 
-    def handle_data(self, theta, distance, quality, s):
-        self.radarView.add_data(theta, distance, quality, s)
+        self.lidar = LidarHandler(self.latency, self.exporter)
+        self.lidar.frame_available.connect(self.handle_frame)
+        self.lidar.start()
 
-    def handle_speed(self, speed):
-        self.radarView.set_speed(speed)
+    def handle_frame(self, frame):
+        self.latency.record("delivery", time.monotonic() - frame.t_emit)
+        self.radarView.set_frame(frame)
 
 
 if __name__ == "__main__":
@@ -171,3 +204,8 @@ if __name__ == "__main__":
     app.activateWindow()
     app.raise_()
     qapp.exec_()
+    print(app.latency.report())
+    if app.exporter is not None:
+        app.exporter.stop()
+        print(f"export: {app.exporter.written} frames written, {app.exporter.dropped + app.exporter.lost} dropped "
+              f"({app.exporter.dropped} queue full, {app.exporter.lost} write errors)")
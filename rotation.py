@@ -0,0 +1,78 @@
+import math
+
+# a gap between valid samples larger than this many nominal steps is not covered
+GAP_STEPS = 1.5
+# a turn whose period is off by more than this ratio is an outlier (partial or missed boundary)
+OUTLIER_RATIO = 0.3
+# after this many consecutive outliers, the rotation speed is considered to have changed
+MAX_OUTLIERS = 3
+
+
+class TurnStats:
+    def __init__(self, frequency, period, samples, coverage, max_gap, jitter):
+        self.frequency = frequency  # smoothed turn frequency, in Hz
+        self.period = period        # duration of this turn, in s
+        self.samples = samples      # number of samples in this turn
+        self.coverage = coverage    # fraction of the turn with valid samples, from 0 to 1
+        self.max_gap = max_gap      # largest angle without valid sample, in degrees
+        self.jitter = jitter        # smoothed RMS deviation of the period, in s
+
+    def __str__(self):
+        return (f"{self.frequency:.2f} Hz, {self.samples} pts, {self.coverage*100:.0f}% covered, "
+                f"gap {self.max_gap:.1f}°, jitter {self.jitter*1000:.1f} ms")
+
+
+class RotationEstimator:
+    """
+    Estimate the rotation of a lidar from the timestamps of the revolution boundaries,
+    independently of the speed unit reported by the driver.
+    Smoothing is a first order low pass filter: alpha is the weight of the last turn,
+    1 means no filtering. Outlier turns are not taken into account.
+    """
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.period = 0
+        self.variance = 0
+        self.outliers = 0
+
+    def update(self, frame, t_next):
+        """
+        Called once per revolution.
+        :param frame: the completed turn
+        :param t_next: timestamp of the first sample of the next turn
+        :return: TurnStats of this turn
+        """
+        period = t_next - frame.t_start
+        if period > 0:
+            deviation = period - self.period
+            if self.period == 0 or self.outliers >= MAX_OUTLIERS:
+                self.period = period
+                self.variance = 0
+                self.outliers = 0
+            elif abs(deviation) > OUTLIER_RATIO * self.period:
+                self.outliers += 1
+            else:
+                self.period += self.alpha * deviation
+                self.variance += self.alpha * (deviation ** 2 - self.variance)
+                self.outliers = 0
+        frequency = 1 / self.period if self.period > 0 else 0
+        coverage, max_gap = self.angular_coverage(frame)
+        return TurnStats(frequency, period, len(frame), coverage, max_gap, math.sqrt(self.variance))
+
+    @staticmethod
+    def angular_coverage(frame):
+        """
+        The nominal step is 360° divided by the number of samples of the turn, valid or not.
+        Gaps between valid samples larger than GAP_STEPS steps are not covered.
+        :return: fraction of the turn covered by valid samples,
+        and the largest angle without valid sample, in degrees.
+        """
+        angles = sorted(math.degrees(angle) % 360 for angle, distance, quality in frame
+                        if distance != 0 and quality != 0)
+        if not angles:
+            return 0, 360
+        step = 360 / len(frame)
+        gaps = [b - a for a, b in zip(angles, angles[1:])]
+        gaps.append(angles[0] + 360 - angles[-1])
+        uncovered = sum(gap - step for gap in gaps if gap > GAP_STEPS * step)
+        return max(0, 1 - uncovered / 360), max(gaps)
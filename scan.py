@@ -0,0 +1,31 @@
+class Frame:
+    """
+    One lidar revolution. angles are in radians, timestamps in the time.monotonic() timebase.
+    """
+    def __init__(self):
+        self.angles = []
+        self.distances = []
+        self.qualities = []
+        self.timestamps = []
+        self.t_emit = 0
+        self.stats = None
+
+    def append(self, angle, distance, quality, timestamp):
+        self.angles.append(angle)
+        self.distances.append(distance)
+        self.qualities.append(quality)
+        self.timestamps.append(timestamp)
+
+    def __len__(self):
+        return len(self.angles)
+
+    def __iter__(self):
+        return zip(self.angles, self.distances, self.qualities)
+
+    @property
+    def t_start(self):
+        return self.timestamps[0] if self.timestamps else 0
+
+    @property
+    def t_end(self):
+        return self.timestamps[-1] if self.timestamps else 0
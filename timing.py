@@ -0,0 +1,127 @@
+import bisect
+
+# latency histogram buckets: 10 per decade, from 10us to 10s
+BUCKETS_PER_DECADE = 10
+MIN_LATENCY = 1e-5
+NB_DECADES = 6
+
+STAGES = ["read", "decode", "delivery", "paint", "end_to_end"]
+
+
+class SampleClock:
+    """
+    Give a monotonic timestamp to each sample from the time its bytes were received.
+    The sample time is anchored to the receive time of its packet, minus the time needed
+    to measure the samples after it in the packet.
+    When the rotation rate is known, the time is interpolated from the previous sample
+    and pulled toward the anchor by gain, which smooths the receive jitter without
+    drifting when the rate is wrong. It is resynchronized on the anchor when they are
+    more than max_lag apart, and never goes after the anchor.
+    """
+    def __init__(self, gain=0.05, max_lag=0.02):
+        self.gain = gain
+        self.max_lag = max_lag
+        self.last_time = None
+        self.last_angle = 0
+
+    def stamp(self, rx_time, angle, rate=0, lead=0):
+        """
+        :param rx_time: time.monotonic() when the packet bytes were received
+        :param angle: sample angle in degrees
+        :param rate: rotation rate in deg/s, 0 if unknown
+        :param lead: angle between this sample and the last sample of the packet, in degrees
+        :return: the sample timestamp, in the time.monotonic() timebase
+        """
+        t = rx_time
+        if rate > 0:
+            t = rx_time - lead / rate
+            if self.last_time is not None:
+                predicted = self.last_time + ((angle - self.last_angle) % 360) / rate
+                if predicted <= t and t - predicted < self.max_lag:
+                    t = predicted + self.gain * (t - predicted)
+        self.last_time = t
+        self.last_angle = angle
+        return t
+
+
+class LatencyHistogram:
+    def __init__(self):
+        nb_bounds = BUCKETS_PER_DECADE * NB_DECADES + 1
+        self.bounds = [MIN_LATENCY * 10 ** (i / BUCKETS_PER_DECADE) for i in range(nb_bounds)]
+        self.counts = [0] * (nb_bounds + 1)
+        self.count = 0
+        self.negative = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, latency):
+        if latency < 0:
+            # clocks out of sync: counted apart, not in the histogram
+            self.negative += 1
+            return
+        self.counts[bisect.bisect_left(self.bounds, latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, p):
+        """
+        :return: upper bound of the bucket holding the p-th percentile (p in 0-100)
+        """
+        if self.count == 0:
+            return 0
+        rank = p / 100 * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= rank and c:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def buckets(self):
+        """
+        :return: list of (upper bound, count) for non-empty buckets
+        """
+        return [(self.bounds[i] if i < len(self.bounds) else float("inf"), c)
+                for i, c in enumerate(self.counts) if c]
+
+    def format(self, width=40):
+        lines = []
+        buckets = self.buckets()
+        peak = max((c for _, c in buckets), default=0)
+        for upper, c in buckets:
+            bar = "#" * max(1, round(c * width / peak))
+            lines.append(f"  <{upper * 1000:9.3f} ms {c:8d} {bar}")
+        return "\n".join(lines)
+
+
+class LatencyTracker:
+    """
+    Latency histograms of each stage from the lidar to the screen:
+    read: sample measured -> bytes received
+    decode: bytes received -> sample decoded
+    delivery: frame emitted by the lidar thread -> frame received by the GUI thread
+    paint: duration of the paint
+    end_to_end: last sample of the frame measured -> frame painted
+    """
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+
+    def record(self, stage, latency):
+        self.histograms[stage].record(latency)
+
+    def summary(self, stage):
+        h = self.histograms[stage]
+        return f"{stage}: p50 {h.percentile(50)*1000:.1f} ms, p95 {h.percentile(95)*1000:.1f} ms"
+
+    def report(self):
+        lines = []
+        for stage, h in self.histograms.items():
+            lines.append(f"{stage}: n={h.count} negative={h.negative} mean={h.mean()*1000:.3f} ms p50={h.percentile(50)*1000:.3f} ms "
+                         f"p95={h.percentile(95)*1000:.3f} ms p99={h.percentile(99)*1000:.3f} ms max={h.max*1000:.3f} ms")
+            if h.count:
+                lines.append(h.format())
+        return "\n".join(lines)
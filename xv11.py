@@ -5,6 +5,7 @@ import time
 import socket
 import json
 from math import radians, cos, sin
+from timing import SampleClock
 
 QUAL = 0
 DIST = 0
@@ -26,6 +27,9 @@ class XV11:
         self.index = 0
         self.bytes_left = 2
         self.speed = 0
+        self.rx_time = 0
+        self.timestamp = 0
+        self.clock = SampleClock()
 
     @staticmethod
     def process_data(angle, data):
@@ -74,6 +78,7 @@ class XV11:
 
                 # checksum
                 b_checksum = [b for b in self.serial.read(2)]
+                self.rx_time = time.monotonic()
                 incoming_checksum = int(b_checksum[0]) + (int(b_checksum[1]) << 8)
 
                 # verify that the received checksum is equal to the one computed from the data
@@ -83,10 +88,11 @@ class XV11:
 
                     # motor_control(speed_rpm)
                     self.speed = (b_speed[0] | b_speed[1] << 8)/64
-                    yield self.process_data(self.index * 4 + 0, b_data0)
-                    yield self.process_data(self.index * 4 + 1, b_data1)
-                    yield self.process_data(self.index * 4 + 2, b_data2)
-                    yield self.process_data(self.index * 4 + 3, b_data3)
+                    for i, b_data in enumerate((b_data0, b_data1, b_data2, b_data3)):
+                        angle = self.index * 4 + i
+                        # speed is in RPM
+                        self.timestamp = self.clock.stamp(self.rx_time, angle, self.speed * 6, 3 - i)
+                        yield self.process_data(angle, b_data)
 
                     #if index == packet_per_cyle:
                     #    cycle = (cycle + 1) % 2